@@ -0,0 +1,170 @@
+"""
+Measures how /explain throughput scales with the number of worker processes.
+
+For each worker count the API is started through project.serve on the
+existing explanation snapshot, and every emoji in that snapshot is requested
+repeatedly for a fixed duration, so the numbers cover the cache/snapshot hot
+path rather than the database or the LLM. Load is generated from several
+processes so the client is not the bottleneck; for clean numbers pin the
+server and the client to separate cores (or machines).
+
+Several workers share their rate limits through Redis, so measuring more
+than one worker needs RATE_LIMIT_REDIS_URL, exactly like serving does.
+
+Usage (database and Redis running, snapshot built):
+    python -m project.buildExplanationSnapshot_service
+    RATE_LIMIT_REDIS_URL=redis://localhost:6379/0 \
+        python -m benchmarks.explain_throughput --workers 1 2 4 8 --duration 15
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+from project.explanation_store import ExplanationSnapshot
+
+UNLIMITED_RATE = {
+    "RATE_LIMIT_HIT_BURST": "1000000000",
+    "RATE_LIMIT_HIT_PER_MINUTE": "1000000000",
+}
+
+
+def start_server(workers: int, port: int, snapshot: str) -> subprocess.Popen:
+    env = dict(os.environ, **UNLIMITED_RATE, ROLLUP_INTERVAL_SECONDS="0")
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "project.serve",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--snapshot",
+            snapshot,
+            "--no-snapshot-refresh",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/openapi.json").status_code == 200:
+                time.sleep(workers * 0.5)
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+async def drive(
+    url: str, emojis: List[str], connections: int, duration: float
+) -> Tuple[int, int, List[float]]:
+    deadline = time.monotonic() + duration
+    latencies: List[float] = []
+    errors = 0
+
+    async def connection(offset: int) -> None:
+        nonlocal errors
+        index = offset
+        async with httpx.AsyncClient(base_url=url) as client:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/explain", params={"emoji": emojis[index % len(emojis)]}
+                )
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+                index += connections
+
+    await asyncio.gather(*(connection(offset) for offset in range(connections)))
+    return len(latencies), errors, latencies
+
+
+def client_process(
+    args: Tuple[str, List[str], int, float]
+) -> Tuple[int, int, List[float]]:
+    return asyncio.run(drive(*args))
+
+
+def measure(
+    url: str, emojis: List[str], clients: int, concurrency: int, duration: float
+) -> Tuple[float, float, float, int]:
+    per_client = max(1, concurrency // clients)
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(
+            client_process, [(url, emojis, per_client, duration)] * clients
+        )
+    completed = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    latencies = sorted(latency for result in results for latency in result[2])
+    p50 = statistics.median(latencies) if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    return completed / duration, p50 * 1000, p99 * 1000, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, os.cpu_count() or 4],
+        help="Worker counts to measure",
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--snapshot",
+        default=os.getenv("EXPLANATION_SNAPSHOT_PATH", "explanations.snapshot"),
+    )
+    args = parser.parse_args()
+    if max(args.workers) > 1 and not os.getenv("RATE_LIMIT_REDIS_URL"):
+        sys.exit("Set RATE_LIMIT_REDIS_URL to measure more than one worker")
+    emojis = list(ExplanationSnapshot(args.snapshot).characters())
+    if not emojis:
+        sys.exit(f"{args.snapshot} is empty; build it from a populated database first")
+
+    print(f"{len(emojis)} emojis, {args.concurrency} connections, {args.duration}s each")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        server = start_server(workers, args.port, args.snapshot)
+        try:
+            throughput, p50, p99, errors = measure(
+                f"http://127.0.0.1:{args.port}",
+                emojis,
+                args.clients,
+                args.concurrency,
+                args.duration,
+            )
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        baseline = baseline or throughput
+        print(
+            f"{workers:>8} {throughput:>10.0f} {throughput / baseline:>7.2f}x"
+            f" {p50:>8.2f} {p99:>8.2f} {errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
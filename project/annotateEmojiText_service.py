@@ -0,0 +1,262 @@
+import asyncio
+import os
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import emoji
+import prisma
+import prisma.models
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from project.errors import PayloadTooLargeError
+from project.explainEmoji_service import fetch_explanation_from_external_service
+from project.explanation_store import explanation_store
+from project.rate_limiter import RateLimitExceeded, RateLimitScope
+from project.recordEmojiRequests_service import recordEmojiRequests
+from pydantic import BaseModel, ValidationError
+
+MAX_TEXT_LENGTH = int(os.getenv("ANNOTATE_MAX_TEXT_LENGTH", "4096"))
+MAX_STREAM_TEXT_LENGTH = int(os.getenv("ANNOTATE_MAX_STREAM_TEXT_LENGTH", "100000"))
+# A character escaped in a JSON string takes at most 12 bytes (a \uXXXX surrogate pair).
+MAX_BODY_BYTES = MAX_STREAM_TEXT_LENGTH * 12 + 1024
+UPSTREAM_CONCURRENCY = int(os.getenv("ANNOTATE_UPSTREAM_CONCURRENCY", "4"))
+
+
+class AnnotateEmojiRequest(BaseModel):
+    """
+    A free-text message, such as a chat message, whose emojis should be explained.
+    """
+
+    text: str
+
+
+class EmojiSpan(BaseModel):
+    """
+    One emoji found in the message, with its code point offsets and its explanation. The explanation is None if it could not be resolved, e.g. because the upstream budget was exhausted.
+    """
+
+    emoji_character: str
+    start: int
+    end: int
+    explanation: Optional[str] = None
+
+
+class AnnotateEmojiResponse(BaseModel):
+    """
+    Every emoji span found in the message, in order of appearance.
+    """
+
+    spans: List[EmojiSpan]
+
+
+async def read_annotate_request(request: Request) -> AnnotateEmojiRequest:
+    """
+    FastAPI dependency that reads and parses the /api/emoji/annotate body, refusing bodies larger than MAX_BODY_BYTES before they are read in full or parsed.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        AnnotateEmojiRequest: The parsed request body.
+
+    Raises:
+        PayloadTooLargeError: If the body is larger than MAX_BODY_BYTES.
+        RequestValidationError: If the body is not a valid AnnotateEmojiRequest.
+    """
+    too_large = PayloadTooLargeError(f"Request body exceeds {MAX_BODY_BYTES} bytes")
+    if int(request.headers.get("content-length") or 0) > MAX_BODY_BYTES:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            raise too_large
+    try:
+        return AnnotateEmojiRequest.model_validate_json(bytes(body))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(), body=bytes(body))
+
+
+def extract_emoji_spans(text: str) -> List[EmojiSpan]:
+    """
+    Finds all emojis in a text in a single left-to-right pass over the emoji trie, preferring the longest match so that ZWJ sequences, skin tones and flags stay whole.
+
+    Args:
+        text (str): The text to scan.
+
+    Returns:
+        List[EmojiSpan]: Unresolved spans in order of appearance.
+    """
+    return [
+        EmojiSpan(
+            emoji_character=match["emoji"],
+            start=match["match_start"],
+            end=match["match_end"],
+        )
+        for match in emoji.emoji_list(text)
+    ]
+
+
+async def resolve_explanations(
+    characters: Iterable[str], rate_limit: Optional[RateLimitScope] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Resolves explanations for a set of distinct emojis in bulk: first from the explanation cache and snapshot, then with a single database query for the rest, and only then from the external service for emojis that have never been explained. Each of those is charged against the upstream budget before any database write, at most UPSTREAM_CONCURRENCY are fetched at a time, and their rows are written with one create_many per table.
+
+    Args:
+        characters (Iterable[str]): Distinct emoji characters.
+        rate_limit (Optional[RateLimitScope]): Rate limit identities of the caller, charged for each upstream lookup.
+
+    Returns:
+        Dict[str, Optional[str]]: Explanation per emoji, None where the upstream budget was exhausted.
+    """
+    resolved: Dict[str, Optional[str]] = {}
+    missing: List[str] = []
+    for character in characters:
+        explanation = explanation_store.get(character)
+        if explanation is None:
+            missing.append(character)
+        else:
+            resolved[character] = explanation
+    if not missing:
+        return resolved
+    records = await prisma.models.Emoji.prisma().find_many(
+        where={"character": {"in": missing}},
+        include={"explanations": {"order_by": {"createdAt": "desc"}, "take": 1}},
+    )
+    for record in records:
+        if record.explanations:
+            resolved[record.character] = record.explanations[0].text
+            explanation_store.put(record.character, record.explanations[0].text)
+    unexplained = [character for character in missing if character not in resolved]
+    allowed: List[str] = []
+    for character in unexplained:
+        if rate_limit:
+            try:
+                await rate_limit.acquire_upstream()
+            except RateLimitExceeded:
+                break
+        allowed.append(character)
+    for character in unexplained[len(allowed) :]:
+        resolved[character] = None
+    if not allowed:
+        return resolved
+    semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+
+    async def fetch(character: str) -> str:
+        async with semaphore:
+            return await fetch_explanation_from_external_service(character)
+
+    texts = await asyncio.gather(*(fetch(character) for character in allowed))
+    known = {record.character for record in records}
+    await prisma.models.Emoji.prisma().create_many(
+        data=[
+            {"character": character} for character in allowed if character not in known
+        ],
+        skip_duplicates=True,
+    )
+    emoji_ids = {
+        record.character: record.id
+        for record in await prisma.models.Emoji.prisma().find_many(
+            where={"character": {"in": allowed}}
+        )
+    }
+    await prisma.models.Explanation.prisma().create_many(
+        data=[
+            {"text": text, "emojiId": emoji_ids[character]}
+            for character, text in zip(allowed, texts)
+        ]
+    )
+    for character, text in zip(allowed, texts):
+        resolved[character] = text
+        explanation_store.put(character, text)
+    return resolved
+
+
+async def annotateEmojiText(
+    text: str,
+    rate_limit: Optional[RateLimitScope] = None,
+    user_id: Optional[int] = None,
+) -> AnnotateEmojiResponse:
+    """
+    Explains every emoji in a free-text message. Emojis are extracted with their offsets, deduplicated, and resolved in bulk.
+
+    Args:
+        text (str): The message to annotate, at most ANNOTATE_MAX_TEXT_LENGTH characters.
+        rate_limit (Optional[RateLimitScope]): Rate limit identities of the caller, charged for each upstream lookup.
+        user_id (Optional[int]): The authenticated caller, whose request for each distinct emoji is recorded for the request statistics.
+
+    Returns:
+        AnnotateEmojiResponse: The annotated emoji spans.
+
+    Raises:
+        PayloadTooLargeError: If the message is too long.
+
+    Example:
+        await annotateEmojiText('Good luck 🍀 see you 👋')
+        > AnnotateEmojiResponse(spans=[EmojiSpan(emoji_character='🍀', start=10, end=11, explanation='A four leaf clover, a symbol of luck.'), EmojiSpan(emoji_character='👋', start=20, end=21, explanation='A waving hand, a greeting.')])
+    """
+    if len(text) > MAX_TEXT_LENGTH:
+        raise PayloadTooLargeError(
+            f"Message exceeds {MAX_TEXT_LENGTH} characters; use streaming for longer messages"
+        )
+    spans = extract_emoji_spans(text)
+    explanations = await resolve_explanations(
+        dict.fromkeys(span.emoji_character for span in spans), rate_limit
+    )
+    for span in spans:
+        span.explanation = explanations[span.emoji_character]
+    await recordEmojiRequests(user_id, explanations)
+    return AnnotateEmojiResponse(spans=spans)
+
+
+def streamEmojiAnnotations(
+    text: str,
+    rate_limit: Optional[RateLimitScope] = None,
+    user_id: Optional[int] = None,
+    batch_size: int = 256,
+) -> AsyncIterator[str]:
+    """
+    Streams the annotated emoji spans of a long message as NDJSON, one EmojiSpan per line. The message is scanned on a worker thread, so a long message does not stall the event loop, and spans are resolved in batches, so the first lines are sent before the whole message has been resolved and each distinct emoji is resolved only once.
+
+    Args:
+        text (str): The message to annotate, at most ANNOTATE_MAX_STREAM_TEXT_LENGTH characters.
+        rate_limit (Optional[RateLimitScope]): Rate limit identities of the caller, charged for each upstream lookup.
+        user_id (Optional[int]): The authenticated caller, whose request for each distinct emoji is recorded for the request statistics.
+        batch_size (int): Number of spans resolved and emitted together.
+
+    Returns:
+        AsyncIterator[str]: NDJSON lines, one per span.
+
+    Raises:
+        PayloadTooLargeError: If the message is too long. Raised before streaming starts, so it can still be answered with a status code.
+    """
+    if len(text) > MAX_STREAM_TEXT_LENGTH:
+        raise PayloadTooLargeError(f"Message exceeds {MAX_STREAM_TEXT_LENGTH} characters")
+    return _stream_annotations(text, rate_limit, user_id, batch_size)
+
+
+async def _stream_annotations(
+    text: str,
+    rate_limit: Optional[RateLimitScope],
+    user_id: Optional[int],
+    batch_size: int,
+) -> AsyncIterator[str]:
+    spans = await asyncio.to_thread(extract_emoji_spans, text)
+    explanations: Dict[str, Optional[str]] = {}
+    for offset in range(0, len(spans), batch_size):
+        batch = spans[offset : offset + batch_size]
+        resolved = await resolve_explanations(
+            dict.fromkeys(
+                span.emoji_character
+                for span in batch
+                if span.emoji_character not in explanations
+            ),
+            rate_limit,
+        )
+        await recordEmojiRequests(user_id, resolved)
+        explanations.update(resolved)
+        lines = []
+        for span in batch:
+            span.explanation = explanations[span.emoji_character]
+            lines.append(span.model_dump_json() + "\n")
+        yield "".join(lines)
@@ -0,0 +1,55 @@
+from typing import Optional
+
+import jwt
+import prisma
+import prisma.enums
+import prisma.models
+from fastapi import Request
+from project.errors import AuthenticationError, PermissionDeniedError
+
+SECRET_KEY = "YOUR_SECRET_KEY"
+
+
+def bearer_user_id(request: Request) -> Optional[int]:
+    """
+    Returns the user ID of a valid bearer token, as issued by loginUser and registerUser.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        Optional[int]: The user ID, or None if no valid token was presented.
+    """
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return None
+    return payload.get("user_id")
+
+
+async def require_admin(request: Request) -> prisma.models.User:
+    """
+    FastAPI dependency for the /admin routes. Only lets requests through whose bearer token belongs to an administrator.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        prisma.models.User: The authenticated administrator.
+
+    Raises:
+        AuthenticationError: If no valid token was presented or its user no longer exists.
+        PermissionDeniedError: If the user is not an administrator.
+    """
+    user_id = bearer_user_id(request)
+    if user_id is None:
+        raise AuthenticationError("A valid bearer token is required.")
+    user = await prisma.models.User.prisma().find_unique(where={"id": user_id})
+    if user is None:
+        raise AuthenticationError("User not found or access token invalid.")
+    if user.role != prisma.enums.Role.Admin:
+        raise PermissionDeniedError("Administrator access is required.")
+    return user
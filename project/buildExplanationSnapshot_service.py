@@ -0,0 +1,87 @@
+import asyncio
+from typing import AsyncIterator, Tuple
+
+import prisma
+import prisma.models
+from project.explanation_store import write_snapshot
+from pydantic import BaseModel
+
+
+class SnapshotBuildResponse(BaseModel):
+    """
+    Describes a freshly written explanation snapshot.
+    """
+
+    path: str
+    entries: int
+
+
+async def iter_latest_explanations(
+    chunk_size: int = 1000,
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Yields every emoji that has an explanation together with its most recent explanation, reading the Emoji table in id-ordered chunks.
+
+    Args:
+        chunk_size (int): Number of emojis read per query.
+
+    Returns:
+        AsyncIterator[Tuple[str, str]]: (emoji character, explanation) pairs.
+    """
+    last_id = 0
+    while True:
+        emojis = await prisma.models.Emoji.prisma().find_many(
+            where={"id": {"gt": last_id}},
+            order={"id": "asc"},
+            take=chunk_size,
+            include={"explanations": {"order_by": {"createdAt": "desc"}, "take": 1}},
+        )
+        for emoji in emojis:
+            if emoji.explanations:
+                yield emoji.character, emoji.explanations[0].text
+        if len(emojis) < chunk_size:
+            break
+        last_id = emojis[-1].id
+
+
+async def buildExplanationSnapshot(path: str) -> SnapshotBuildResponse:
+    """
+    Writes the latest explanation of every emoji to an on-disk snapshot that workers can map at startup and serve without the database.
+
+    Args:
+        path (str): Destination of the snapshot file.
+
+    Returns:
+        SnapshotBuildResponse: The path and number of entries written.
+
+    Example:
+        await buildExplanationSnapshot('explanations.snapshot')
+        > SnapshotBuildResponse(path='explanations.snapshot', entries=3664)
+    """
+    items = [item async for item in iter_latest_explanations()]
+    entries = write_snapshot(path, items)
+    return SnapshotBuildResponse(path=path, entries=entries)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(
+        description="Build the explanation snapshot from the database."
+    )
+    parser.add_argument(
+        "--output",
+        default=os.getenv("EXPLANATION_SNAPSHOT_PATH", "explanations.snapshot"),
+    )
+    args = parser.parse_args()
+
+    async def main() -> None:
+        client = prisma.Prisma(auto_register=True)
+        await client.connect()
+        try:
+            print(await buildExplanationSnapshot(args.output))
+        finally:
+            await client.disconnect()
+
+    asyncio.run(main())
@@ -0,0 +1,243 @@
+import asyncio
+import codecs
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+import prisma
+import prisma.enums
+import prisma.models
+from project.registerUser_service import hash_passwords
+from pydantic import BaseModel
+
+UserFileFormat = Literal["csv", "ndjson"]
+
+HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))
+)
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+class BulkImportResponse(BaseModel):
+    """
+    Summary of a bulk user import, including the achieved throughput.
+    """
+
+    imported: int
+    skipped_existing: int
+    duplicates: int
+    invalid: int
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Splits a stream of UTF-8 byte chunks, such as a request body, into text lines without buffering the whole stream.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw byte chunks.
+
+    Returns:
+        AsyncIterator[str]: The decoded lines, without line terminators.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_records(
+    lines: AsyncIterator[str], format: UserFileFormat
+) -> AsyncIterator[Optional[Dict[str, str]]]:
+    """
+    Parses user records from CSV (with an email,password header) or NDJSON lines. Each CSV record must fit on one line.
+
+    Args:
+        lines (AsyncIterator[str]): The input lines.
+        format (UserFileFormat): Either "csv" or "ndjson".
+
+    Returns:
+        AsyncIterator[Optional[Dict[str, str]]]: One record per non-empty line, or None for lines that cannot be parsed.
+    """
+    header: Optional[List[str]] = None
+    async for line in lines:
+        if not line.strip():
+            continue
+        if format == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            continue
+        yield dict(zip(header, values)) if len(values) == len(header) else None
+
+
+def hash_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool that hashes imported passwords. It is created on first use and shared by every import in this process, so concurrent imports queue for HASH_WORKERS processes instead of each starting a pool per CPU.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    """
+    Stops the hashing processes, if any were started. Blocks until they have exited.
+    """
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown()
+        _hash_pool = None
+
+
+def _validated(record: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    if not record:
+        return None
+    email = str(record.get("email") or "").strip()
+    password = str(record.get("password") or "")
+    if "@" not in email or not password:
+        return None
+    return {"email": email, "password": password}
+
+
+async def _import_chunk(records: List[Dict[str, str]]) -> Tuple[int, int]:
+    by_email = {record["email"]: record for record in records}
+    duplicates = len(records) - len(by_email)
+    existing = await prisma.models.User.prisma().find_many(
+        where={"email": {"in": list(by_email)}}
+    )
+    for user in existing:
+        by_email.pop(user.email, None)
+    new_records = list(by_email.values())
+    if not new_records:
+        return 0, duplicates
+    passwords = [record["password"] for record in new_records]
+    slice_size = -(-len(passwords) // HASH_WORKERS)
+    loop = asyncio.get_running_loop()
+    hashed_slices = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                hash_pool(), hash_passwords, passwords[start : start + slice_size]
+            )
+            for start in range(0, len(passwords), slice_size)
+        )
+    )
+    hashes = [hashed for hashed_slice in hashed_slices for hashed in hashed_slice]
+    imported = await prisma.models.User.prisma().create_many(
+        data=[
+            {
+                "email": record["email"],
+                "role": prisma.enums.Role.User,
+                "hashed_password": hashed,
+            }
+            for record, hashed in zip(new_records, hashes)
+        ],
+        skip_duplicates=True,
+    )
+    return imported, duplicates
+
+
+async def bulkImportUsers(
+    lines: AsyncIterator[str],
+    format: UserFileFormat = "csv",
+    chunk_size: int = 1000,
+) -> BulkImportResponse:
+    """
+    Registers users in bulk from a CSV or NDJSON stream. Records are processed in chunks: one find_many per chunk filters out emails that are already registered, the remaining passwords are bcrypt-hashed in parallel on the shared process pool, and the chunk is written with a single create_many. Every imported user gets the User role; roles in the input are ignored. Restricted to administrators only.
+
+    Args:
+        lines (AsyncIterator[str]): The input lines, read lazily.
+        format (UserFileFormat): Either "csv" or "ndjson".
+        chunk_size (int): Number of records checked, hashed and inserted together.
+
+    Returns:
+        BulkImportResponse: Counts of imported, already registered, repeated and invalid rows, and the throughput. A row is counted as repeated when an earlier row of the same chunk has the same email.
+
+    Example:
+        response = await bulkImportUsers(iter_lines(request.stream()), "ndjson")
+        > BulkImportResponse(imported=4980, skipped_existing=12, duplicates=3, invalid=8, elapsed_seconds=21.4, rows_per_second=233.6)
+    """
+    started = time.perf_counter()
+    imported = 0
+    duplicates = 0
+    total_valid = 0
+    invalid = 0
+    chunk: List[Dict[str, str]] = []
+    async for record in iter_records(lines, format):
+        validated = _validated(record)
+        if validated is None:
+            invalid += 1
+            continue
+        chunk.append(validated)
+        if len(chunk) >= chunk_size:
+            chunk_imported, chunk_duplicates = await _import_chunk(chunk)
+            imported += chunk_imported
+            duplicates += chunk_duplicates
+            total_valid += len(chunk)
+            chunk = []
+    if chunk:
+        chunk_imported, chunk_duplicates = await _import_chunk(chunk)
+        imported += chunk_imported
+        duplicates += chunk_duplicates
+        total_valid += len(chunk)
+    elapsed = time.perf_counter() - started
+    return BulkImportResponse(
+        imported=imported,
+        skipped_existing=total_valid - imported - duplicates,
+        duplicates=duplicates,
+        invalid=invalid,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round((total_valid + invalid) / elapsed, 1) if elapsed else 0.0,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import users from a file.")
+    parser.add_argument("path", help="CSV or NDJSON file to import")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=HASH_WORKERS)
+    args = parser.parse_args()
+    HASH_WORKERS = args.workers
+    file_format = args.format or ("ndjson" if args.path.endswith(".ndjson") else "csv")
+
+    async def read_lines(path: str) -> AsyncIterator[str]:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                yield line.rstrip("\r\n")
+
+    async def main() -> None:
+        client = prisma.Prisma(auto_register=True)
+        await client.connect()
+        try:
+            print(
+                await bulkImportUsers(read_lines(args.path), file_format, args.chunk_size)
+            )
+        finally:
+            shutdown_hash_pool()
+            await client.disconnect()
+
+    asyncio.run(main())
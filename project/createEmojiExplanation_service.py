@@ -1,5 +1,6 @@
 import prisma
 import prisma.models
+from project.errors import NotFoundError, PermissionDeniedError
 from pydantic import BaseModel
 
 
@@ -22,19 +23,20 @@ async def createEmojiExplanation(emoji_character: str) -> EmojiExplanationRespon
         EmojiExplanationResponseModel: Contains the explanation for the requested emoji, returned after verifying user authentication and role.
 
     Raises:
-        ValueError: If no explanation is found for the given emoji.
+        PermissionDeniedError: If the user is not authenticated or lacks the required role.
+        NotFoundError: If no explanation is found for the given emoji.
     """
     user = await prisma.models.User.prisma().find_first(
         where={"email": "authenticated_user_email@example.com"}, include={"role": True}
     )
     if user is None or user.role not in ["Admin", "User"]:
-        raise PermissionError(
+        raise PermissionDeniedError(
             "User is not authenticated or does not have the required access rights."
         )
     emoji = await prisma.models.Emoji.prisma().find_unique(
         where={"character": emoji_character}, include={"explanations": True}
     )
     if emoji is None or not emoji.explanations:
-        raise ValueError("No explanation available for the provided emoji.")
+        raise NotFoundError("No explanation available for the provided emoji.")
     explanation = emoji.explanations[0]
     return EmojiExplanationResponseModel(explanation_text=explanation.text)
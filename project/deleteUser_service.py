@@ -1,5 +1,6 @@
 import prisma
 import prisma.models
+from project.errors import NotFoundError
 from pydantic import BaseModel
 
 
@@ -22,6 +23,9 @@ async def deleteUser(user_id: int) -> DeleteUserResponse:
     Returns:
         DeleteUserResponse: This model outlines the expected response when a user successfully deletes their account. It communicates the successful removal of the user data from the system.
 
+    Raises:
+        NotFoundError: If no user exists with the given ID.
+
     Example:
         deleteUser(10)
         > Deleting user with ID 10 results in DeleteUserResponse(message='User successfully deleted.', user_id=10)
@@ -33,7 +37,7 @@ async def deleteUser(user_id: int) -> DeleteUserResponse:
         )
         return response
     else:
-        raise Exception("User not found or could not be deleted")
+        raise NotFoundError("User not found or could not be deleted")
     return DeleteUserResponse(
         message="User has been successfully removed from the database", user_id=user_id
     )
@@ -0,0 +1,41 @@
+from typing import Dict, Optional
+
+
+class DomainError(Exception):
+    """
+    Base class for expected failures raised by the services, such as unknown users or invalid input. The server maps them to their status_code without logging a traceback.
+    """
+
+    status_code = 400
+
+    def __init__(self, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.headers = headers
+
+
+class InvalidInputError(DomainError):
+    status_code = 400
+
+
+class AuthenticationError(DomainError):
+    status_code = 401
+
+
+class PermissionDeniedError(DomainError):
+    status_code = 403
+
+
+class NotFoundError(DomainError):
+    status_code = 404
+
+
+class AlreadyExistsError(DomainError):
+    status_code = 409
+
+
+class PayloadTooLargeError(DomainError):
+    status_code = 413
+
+
+class TooManyRequestsError(DomainError):
+    status_code = 429
@@ -1,6 +1,11 @@
+from typing import Optional
+
 import httpx
 import prisma
 import prisma.models
+from project.explanation_store import explanation_store
+from project.rate_limiter import RateLimitScope
+from project.recordEmojiRequests_service import recordEmojiRequests
 from pydantic import BaseModel
 
 
@@ -13,37 +18,54 @@ class EmojiExplanationResponse(BaseModel):
     explanation: str
 
 
-async def explainEmoji(emoji: str) -> EmojiExplanationResponse:
+async def explainEmoji(
+    emoji: str,
+    rate_limit: Optional[RateLimitScope] = None,
+    user_id: Optional[int] = None,
+) -> EmojiExplanationResponse:
     """
-    Retrieves or creates emoji details in the database, queries for an explanation using an external service, and returns the explanation for the given emoji character.
+    Retrieves or creates emoji details in the database, queries for an explanation using an external service, and returns the explanation for the given emoji character. Explanations already held by the in-memory cache or the on-disk snapshot are served without touching the database.
 
     Args:
         emoji (str): The emoji character submitted by the user.
+        rate_limit (Optional[RateLimitScope]): Rate limit identities of the caller, charged before the external service is queried.
+        user_id (Optional[int]): The authenticated caller, whose request is recorded for the request statistics.
 
     Returns:
         EmojiExplanationResponse: A response model that pairs an emoji with its corresponding explanation.
 
+    Raises:
+        RateLimitExceeded: If the explanation is not stored yet and the caller has exhausted its upstream budget.
+
     Example:
         explainEmoji('😊')
         > EmojiExplanationResponse(emoji_character='😊', explanation='A smiling face to express happiness.')
     """
+    cached = explanation_store.get(emoji)
+    if cached is not None:
+        await recordEmojiRequests(user_id, [emoji])
+        return EmojiExplanationResponse(emoji_character=emoji, explanation=cached)
     emoji_record = await prisma.models.Emoji.prisma().find_unique(
         where={"character": emoji}, include={"explanations": True}
     )
-    if not emoji_record:
-        emoji_record = await prisma.models.Emoji.prisma().create(
-            data={"character": emoji}
-        )
-    if emoji_record.explanations:
+    if emoji_record and emoji_record.explanations:
         recent_explanation = max(
             emoji_record.explanations, key=lambda exp: exp.createdAt
         )
         explanation_text = recent_explanation.text
     else:
+        if rate_limit:
+            await rate_limit.acquire_upstream()
         explanation_text = await fetch_explanation_from_external_service(emoji)
+        if not emoji_record:
+            emoji_record = await prisma.models.Emoji.prisma().create(
+                data={"character": emoji}
+            )
         await prisma.models.Explanation.prisma().create(
             data={"text": explanation_text, "emojiId": emoji_record.id}
         )
+    explanation_store.put(emoji, explanation_text)
+    await recordEmojiRequests(user_id, [emoji])
     return EmojiExplanationResponse(emoji_character=emoji, explanation=explanation_text)
 
 
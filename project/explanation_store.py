@@ -0,0 +1,151 @@
+import mmap
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional, Tuple
+
+SNAPSHOT_MAGIC = b"EMJXSNP1"
+_HEADER = struct.Struct("<8sI")
+_ENTRY = struct.Struct("<IIII")
+
+
+class SnapshotFormatError(Exception):
+    """
+    Raised when a file is not a valid explanation snapshot.
+    """
+
+
+def write_snapshot(path: str, items: Iterable[Tuple[str, str]]) -> int:
+    """
+    Writes an explanation snapshot. The file holds a header, a fixed-width index of (key offset, key length, text offset, text length) entries sorted by the UTF-8 bytes of the emoji, and a blob with the keys and texts. The file is written next to its destination and renamed into place, so readers never see a partial snapshot and keep their old mapping until they reopen.
+
+    Args:
+        path (str): Destination of the snapshot.
+        items (Iterable[Tuple[str, str]]): (emoji character, explanation) pairs. Later pairs win for duplicate emojis.
+
+    Returns:
+        int: The number of entries written.
+    """
+    entries = sorted(
+        (key.encode("utf-8"), text.encode("utf-8")) for key, text in dict(items).items()
+    )
+    offset = _HEADER.size + len(entries) * _ENTRY.size
+    index = bytearray()
+    for key, text in entries:
+        index += _ENTRY.pack(offset, len(key), offset + len(key), len(text))
+        offset += len(key) + len(text)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(_HEADER.pack(SNAPSHOT_MAGIC, len(entries)))
+            file.write(index)
+            for key, text in entries:
+                file.write(key)
+                file.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(entries)
+
+
+class ExplanationSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot written by write_snapshot. Lookups binary search the index in place, so opening is O(1) regardless of the catalogue size and pages are shared between all processes mapping the same file.
+
+    Args:
+        path (str): Path of the snapshot file.
+
+    Raises:
+        SnapshotFormatError: If the file is not a snapshot.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise SnapshotFormatError(f"{path} is too short to be a snapshot.")
+        magic, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self._mm.close()
+            raise SnapshotFormatError(f"{path} is not an explanation snapshot.")
+
+    def get(self, emoji: str) -> Optional[str]:
+        target = emoji.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, text_offset, text_length = _ENTRY.unpack_from(
+                self._mm, _HEADER.size + middle * _ENTRY.size
+            )
+            key = self._mm[key_offset : key_offset + key_length]
+            if key < target:
+                low = middle + 1
+            elif key > target:
+                high = middle
+            else:
+                return self._mm[text_offset : text_offset + text_length].decode("utf-8")
+        return None
+
+    def characters(self) -> Iterator[str]:
+        for index in range(self.count):
+            key_offset, key_length, _, _ = _ENTRY.unpack_from(
+                self._mm, _HEADER.size + index * _ENTRY.size
+            )
+            yield self._mm[key_offset : key_offset + key_length].decode("utf-8")
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class ExplanationStore:
+    """
+    Explanation lookup tiers that sit in front of the database: an optional read-only snapshot and a bounded in-memory LRU cache. Snapshot hits are served straight from the mapping and never copied into the cache, so processes sharing a snapshot hold the catalogue once, in the page cache; the LRU only keeps explanations the snapshot does not have, such as ones created since it was built.
+
+    Args:
+        max_entries (int): Capacity of the in-memory cache; the least recently used explanation is evicted first.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self.snapshot: Optional[ExplanationSnapshot] = None
+
+    def open_snapshot(self, path: str) -> None:
+        """
+        Maps a snapshot as the tier in front of the cache, replacing any snapshot opened before.
+
+        Args:
+            path (str): Path of the snapshot file.
+        """
+        snapshot = ExplanationSnapshot(path)
+        if self.snapshot:
+            self.snapshot.close()
+        self.snapshot = snapshot
+
+    def get(self, emoji: str) -> Optional[str]:
+        if self.snapshot:
+            explanation = self.snapshot.get(emoji)
+            if explanation is not None:
+                return explanation
+        explanation = self._cache.get(emoji)
+        if explanation is not None:
+            self._cache.move_to_end(emoji)
+        return explanation
+
+    def put(self, emoji: str, explanation: str) -> None:
+        if self.snapshot and self.snapshot.get(emoji) is not None:
+            return
+        self._cache[emoji] = explanation
+        self._cache.move_to_end(emoji)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+
+explanation_store = ExplanationStore(
+    max_entries=int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+)
@@ -0,0 +1,86 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+from typing import AsyncIterator
+
+import prisma
+import prisma.models
+from project.bulkImportUsers_service import UserFileFormat
+from project.listUsers_service import UserDetail
+
+logger = logging.getLogger(__name__)
+
+
+async def exportUsers(
+    format: UserFileFormat = "csv", chunk_size: int = 1000
+) -> AsyncIterator[str]:
+    """
+    Streams all registered users as CSV or NDJSON. Users are read in id order with keyset pagination, one chunk at a time, so memory use does not grow with the number of users. Restricted to administrators only.
+
+    Args:
+        format (UserFileFormat): Either "csv" or "ndjson".
+        chunk_size (int): Number of users read from the database per query.
+
+    Returns:
+        AsyncIterator[str]: Serialized chunks of the export, one per database query.
+
+    Example:
+        async for part in exportUsers("ndjson"):
+            sys.stdout.write(part)
+    """
+    started = time.perf_counter()
+    exported = 0
+    last_id = 0
+    if format == "csv":
+        yield "id,email,role\r\n"
+    while True:
+        users = await prisma.models.User.prisma().find_many(
+            where={"id": {"gt": last_id}}, order={"id": "asc"}, take=chunk_size
+        )
+        if not users:
+            break
+        details = [
+            UserDetail(id=user.id, email=user.email, role=user.role) for user in users
+        ]
+        if format == "ndjson":
+            yield "".join(detail.model_dump_json() + "\n" for detail in details)
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows((detail.id, detail.email, detail.role) for detail in details)
+            yield buffer.getvalue()
+        exported += len(users)
+        last_id = users[-1].id
+        if len(users) < chunk_size:
+            break
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Exported %d users in %.2fs (%.1f rows/sec)",
+        exported,
+        elapsed,
+        exported / elapsed if elapsed else 0.0,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Export all users to stdout.")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        logging.basicConfig(level=logging.INFO)
+        client = prisma.Prisma(auto_register=True)
+        await client.connect()
+        try:
+            async for part in exportUsers(args.format, args.chunk_size):
+                sys.stdout.write(part)
+        finally:
+            await client.disconnect()
+
+    asyncio.run(main())
@@ -1,6 +1,10 @@
+from typing import Optional
+
 import openai
 import prisma
 import prisma.models
+from project.rate_limiter import RateLimitScope
+from project.recordEmojiRequests_service import recordEmojiRequests
 from pydantic import BaseModel
 
 
@@ -13,16 +17,25 @@ class EmojiExplanationResponse(BaseModel):
     explanation: str
 
 
-async def fetchEmojiExplanation(emoji_character: str) -> EmojiExplanationResponse:
+async def fetchEmojiExplanation(
+    emoji_character: str,
+    rate_limit: Optional[RateLimitScope] = None,
+    user_id: Optional[int] = None,
+) -> EmojiExplanationResponse:
     """
     Fetches an explanation for a given emoji character using the LLaMA model from OpenAI through GPT-3.
 
     Args:
         emoji_character (str): The emoji character for which an explanation is requested.
+        rate_limit (Optional[RateLimitScope]): Rate limit identities of the caller, charged before the model is queried.
+        user_id (Optional[int]): The authenticated caller, whose request is recorded for the request statistics.
 
     Returns:
         EmojiExplanationResponse: A model containing the emoji character and its explanation.
 
+    Raises:
+        RateLimitExceeded: If the explanation is not stored yet and the caller has exhausted its upstream budget.
+
     Example:
         emoji_character = '🚀'
         response = fetchEmojiExplanation(emoji_character)
@@ -35,6 +48,8 @@ async def fetchEmojiExplanation(emoji_character: str) -> EmojiExplanationRespons
     if emoji_record and emoji_record.explanations:
         explanation = emoji_record.explanations[-1].text
     else:
+        if rate_limit:
+            await rate_limit.acquire_upstream()
         response = openai.Completion.create(
             engine="text-davinci-002",
             prompt=f"Explain the emoji {emoji_character}",
@@ -48,6 +63,7 @@ async def fetchEmojiExplanation(emoji_character: str) -> EmojiExplanationRespons
         await prisma.models.Explanation.prisma().create(
             {"text": explanation, "emojiId": emoji_record.id}
         )
+    await recordEmojiRequests(user_id, [emoji_character])
     return EmojiExplanationResponse(
         emoji_character=emoji_character, explanation=explanation
     )
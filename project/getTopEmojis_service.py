@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import List, Optional
+
+import prisma
+import prisma.enums
+import prisma.models
+from pydantic import BaseModel
+
+
+class TopEmoji(BaseModel):
+    """
+    An emoji together with the number of times it was requested in the selected bucket.
+    """
+
+    emoji_character: str
+    count: int
+
+
+class TopEmojisResponse(BaseModel):
+    """
+    The most requested emojis of one hourly or daily bucket, read from the precomputed request rollups.
+    """
+
+    period: prisma.enums.StatPeriod
+    bucket_start: Optional[datetime]
+    emojis: List[TopEmoji]
+
+
+async def getTopEmojis(
+    period: prisma.enums.StatPeriod = prisma.enums.StatPeriod.Day,
+    limit: int = 10,
+    bucket_start: Optional[datetime] = None,
+) -> TopEmojisResponse:
+    """
+    Returns the most requested emojis of an hourly or daily bucket. Reads only the EmojiRequestStat rollups maintained by rollupRequestStats, so the cost depends on the limit and not on the size of the Request table.
+
+    Args:
+        period (prisma.enums.StatPeriod): Bucket granularity, Hour or Day.
+        limit (int): Maximum number of emojis to return.
+        bucket_start (Optional[datetime]): Start of the bucket to read. Defaults to the most recent rolled-up bucket.
+
+    Returns:
+        TopEmojisResponse: The most requested emojis of the bucket, most requested first.
+
+    Example:
+        response = await getTopEmojis(prisma.enums.StatPeriod.Hour, limit=3)
+        > TopEmojisResponse(period='Hour', bucket_start=datetime(2024, 4, 26, 17, 0), emojis=[TopEmoji(emoji_character='😂', count=412), ...])
+    """
+    if bucket_start is None:
+        latest = await prisma.models.EmojiRequestStat.prisma().find_first(
+            where={"period": period}, order={"bucketStart": "desc"}
+        )
+        if latest is None:
+            return TopEmojisResponse(period=period, bucket_start=None, emojis=[])
+        bucket_start = latest.bucketStart
+    stats = await prisma.models.EmojiRequestStat.prisma().find_many(
+        where={"period": period, "bucketStart": bucket_start},
+        order={"count": "desc"},
+        take=limit,
+        include={"emoji": True},
+    )
+    emojis = [
+        TopEmoji(emoji_character=stat.emoji.character, count=stat.count)
+        for stat in stats
+        if stat.emoji
+    ]
+    return TopEmojisResponse(period=period, bucket_start=bucket_start, emojis=emojis)
+
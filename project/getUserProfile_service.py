@@ -1,6 +1,7 @@
 import prisma
 import prisma.enums
 import prisma.models
+from project.errors import NotFoundError
 from pydantic import BaseModel
 
 
@@ -26,6 +27,9 @@ async def getUserProfile(access_token: str) -> UserProfileResponse:
         UserProfileResponse: This model provides the authenticated user's profile information, ensuring it includes
                              only data that the user is authorized to see.
 
+    Raises:
+        NotFoundError: If the token does not identify an existing user.
+
     Example:
         access_token = 'valid_token123'
         user_profile = await getUserProfile(access_token)
@@ -33,7 +37,7 @@ async def getUserProfile(access_token: str) -> UserProfileResponse:
     user_id = decode_access_token(access_token)
     user = await prisma.models.User.prisma().find_unique(where={"id": user_id})
     if not user:
-        raise ValueError("User not found or access token invalid.")
+        raise NotFoundError("User not found or access token invalid.")
     return UserProfileResponse(id=user.id, email=user.email, role=user.role)
 
 
@@ -4,6 +4,7 @@ import bcrypt
 import jwt
 import prisma
 import prisma.models
+from project.errors import AuthenticationError
 from pydantic import BaseModel
 
 
@@ -29,16 +30,13 @@ async def loginUser(email: str, password: str) -> LoginResponse:
         LoginResponse: Response model for a successful login attempt. This contains the access token required for authenticated access.
 
     Raises:
-        ValueError: If the user is not found or password does not match.
+        AuthenticationError: If the user is not found or password does not match.
     """
     user = await prisma.models.User.prisma().find_unique(where={"email": email})
-    if user is None or not hasattr(user, "hashed_password"):
-        raise ValueError("User not found or no password set for this user.")
+    if user is None or user.hashed_password is None:
+        raise AuthenticationError("User not found or no password set for this user.")
     password_bytes = password.encode("utf-8")
-    stored_password_hash = user.hashed_password.encode(
-        "utf-8"
-    )  # TODO(autogpt): Cannot access attribute "hashed_password" for class "User"
-    #     Attribute "hashed_password" is unknown. reportAttributeAccessIssue
+    stored_password_hash = user.hashed_password.encode("utf-8")
     if bcrypt.checkpw(password_bytes, stored_password_hash):
         token_data = {
             "user_id": user.id,
@@ -52,4 +50,4 @@ async def loginUser(email: str, password: str) -> LoginResponse:
         )
         return LoginResponse(access_token=access_token, token_type="Bearer")
     else:
-        raise ValueError("Invalid password.")
+        raise AuthenticationError("Invalid password.")
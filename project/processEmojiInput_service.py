@@ -3,42 +3,52 @@ from typing import Optional
 import emoji
 import prisma
 import prisma.models
+from project.errors import InvalidInputError
+from project.rate_limiter import RateLimitScope
+from project.recordEmojiRequests_service import recordEmojiRequests
 from pydantic import BaseModel
 
 
 class EmojiProcessResponse(BaseModel):
     """
-    This model describes the response that is sent back to the client after processing the emoji. It includes the original emoji and its explanation, or an error message if the validation fails.
+    This model describes the response that is sent back to the client after processing the emoji. It includes the original emoji and its explanation.
     """
 
     emoji_character: str
     explanation: str
-    error: Optional[str] = None
 
 
-async def processEmojiInput(emoji_character: str) -> EmojiProcessResponse:
+async def processEmojiInput(
+    emoji_character: str,
+    rate_limit: Optional[RateLimitScope] = None,
+    user_id: Optional[int] = None,
+) -> EmojiProcessResponse:
     """
     This function validates an emoji character and fetches its explanation using llama3 service accessed via Groq.
 
     Args:
         emoji_character (str): A valid emoji character string that needs to be explained.
+        rate_limit (Optional[RateLimitScope]): Rate limit identities of the caller, charged before llama3 is queried.
+        user_id (Optional[int]): The authenticated caller, whose request is recorded for the request statistics.
 
     Returns:
         EmojiProcessResponse: This model describes the response sent back to the client after processing the emoji.
-        It includes the original emoji and its explanation, or an error message if the validation fails.
+        It includes the original emoji and its explanation.
+
+    Raises:
+        InvalidInputError: If emoji_character is not a single valid emoji.
+        RateLimitExceeded: If the explanation is not stored yet and the caller has exhausted its upstream budget.
     """
     if not validate_emoji(emoji_character):
-        return EmojiProcessResponse(
-            emoji_character=emoji_character,
-            explanation="",
-            error="Invalid emoji character provided",
-        )
+        raise InvalidInputError("Invalid emoji character provided")
     emoji_record = await prisma.models.Emoji.prisma().find_first(
         where={"character": emoji_character}, include={"explanations": True}
     )
     if emoji_record and emoji_record.explanations:
         explanation = emoji_record.explanations[0].text
     else:
+        if rate_limit:
+            await rate_limit.acquire_upstream()
         explanation = await fetch_explanation_from_llama3(emoji_character)
         if not emoji_record:
             emoji_record = await prisma.models.Emoji.prisma().create(
@@ -47,6 +57,7 @@ async def processEmojiInput(emoji_character: str) -> EmojiProcessResponse:
         await prisma.models.Explanation.prisma().create(
             data={"text": explanation, "emojiId": emoji_record.id}
         )
+    await recordEmojiRequests(user_id, [emoji_character])
     return EmojiProcessResponse(
         emoji_character=emoji_character, explanation=explanation
     )
@@ -0,0 +1,285 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import List, Protocol, Tuple
+
+from fastapi import Request
+from project.auth import bearer_user_id
+from project.errors import TooManyRequestsError
+
+
+class RateLimitExceeded(TooManyRequestsError):
+    """
+    Raised when a request has exhausted one of its token buckets. Carries the number of seconds the client should wait before retrying, which is surfaced as the Retry-After header of the 429 response.
+    """
+
+    def __init__(self, retry_after: float, scope: str):
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.scope = scope
+        super().__init__(
+            f"Rate limit exceeded for {scope}. Retry in {self.retry_after}s.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+class BucketSpec:
+    """
+    Capacity and refill rate of a family of token buckets.
+
+    Args:
+        capacity (float): Maximum number of tokens a bucket can hold, i.e. the allowed burst.
+        per_minute (float): Number of tokens refilled per minute.
+
+    Raises:
+        ValueError: If the capacity or the refill rate is not positive. A bucket that never refills would have no finite Retry-After.
+    """
+
+    __slots__ = ("capacity", "rate")
+
+    def __init__(self, capacity: float, per_minute: float):
+        if capacity <= 0 or per_minute <= 0:
+            raise ValueError(
+                f"Token buckets need a positive capacity and refill rate, got {capacity} and {per_minute}/min."
+            )
+        self.capacity = float(capacity)
+        self.rate = float(per_minute) / 60.0
+
+
+class BucketBackend(Protocol):
+    async def take(self, keys: List[Tuple[str, BucketSpec]], cost: float) -> float:
+        """
+        Atomically takes `cost` tokens from every bucket in `keys`, or from none of them.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the number of seconds until all buckets can cover the cost.
+        """
+        ...
+
+
+class InMemoryBucketBackend:
+    """
+    Per-process token buckets stored in a bounded LRU map. Refill is computed lazily from the elapsed time on each access, so a check is a dict lookup plus a little arithmetic.
+
+    Args:
+        max_keys (int): Upper bound on tracked buckets; the least recently used bucket is dropped first. A dropped bucket simply starts full again.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def _refilled(self, key: str, spec: BucketSpec, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [spec.capacity, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(spec.capacity, bucket[0] + (now - bucket[1]) * spec.rate)
+            bucket[1] = now
+        return bucket
+
+    async def take(self, keys: List[Tuple[str, BucketSpec]], cost: float) -> float:
+        now = time.monotonic()
+        buckets = [(self._refilled(key, spec, now), spec) for key, spec in keys]
+        wait = 0.0
+        for bucket, spec in buckets:
+            if bucket[0] < cost:
+                wait = max(wait, (cost - bucket[0]) / spec.rate)
+        if wait:
+            return wait
+        for bucket, _ in buckets:
+            bucket[0] -= cost
+        return 0.0
+
+
+_REDIS_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local wait = 0
+local state = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    state[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    local tokens = state[i]
+    if wait == 0 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+class RedisBucketBackend:
+    """
+    Token buckets shared by every worker through Redis. All buckets of a request are checked and debited in a single Lua script, so the shared backend costs one round trip per check.
+
+    Args:
+        url (str): Redis connection URL, e.g. redis://localhost:6379/0.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed."
+            ) from e
+        self._client = redis.asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE_SCRIPT)
+
+    async def take(self, keys: List[Tuple[str, BucketSpec]], cost: float) -> float:
+        args: List[float] = [time.time(), cost]
+        for _, spec in keys:
+            args.extend([spec.capacity, spec.rate])
+        wait = await self._script(keys=[f"ratelimit:{key}" for key, _ in keys], args=args)
+        return float(wait)
+
+
+def _spec_from_env(prefix: str, capacity: float, per_minute: float) -> BucketSpec:
+    return BucketSpec(
+        capacity=float(os.getenv(f"{prefix}_BURST", capacity)),
+        per_minute=float(os.getenv(f"{prefix}_PER_MINUTE", per_minute)),
+    )
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiting for the LLM-backed endpoints. Every request is charged against the per-client "hit" budget; requests that go on to call the upstream LLM are additionally charged against the per-client and global "miss" budgets.
+    """
+
+    def __init__(
+        self,
+        backend: BucketBackend,
+        hit: BucketSpec,
+        miss: BucketSpec,
+        global_miss: BucketSpec,
+    ):
+        self.backend = backend
+        self.hit = hit
+        self.miss = miss
+        self.global_miss = global_miss
+
+    async def acquire(
+        self, keys: List[Tuple[str, BucketSpec]], scope: str, cost: float = 1.0
+    ) -> None:
+        wait = await self.backend.take(keys, cost)
+        if wait:
+            raise RateLimitExceeded(wait, scope)
+
+
+class RateLimitScope:
+    """
+    The rate limit identities of a single request, handed to services so they can charge the upstream budget right before calling the LLM.
+    """
+
+    def __init__(self, limiter: RateLimiter, clients: List[str]):
+        self.limiter = limiter
+        self.clients = clients
+
+    async def acquire_hit(self) -> None:
+        await self.limiter.acquire(
+            [(f"hit:{client}", self.limiter.hit) for client in self.clients], "requests"
+        )
+
+    async def acquire_upstream(self) -> None:
+        keys = [(f"miss:{client}", self.limiter.miss) for client in self.clients]
+        keys.append(("miss:global", self.limiter.global_miss))
+        await self.limiter.acquire(keys, "upstream explanations")
+
+
+def create_rate_limiter() -> RateLimiter:
+    """
+    Builds the process rate limiter from the environment. Buckets live in memory unless RATE_LIMIT_REDIS_URL points at a Redis instance shared by all workers.
+
+    Returns:
+        RateLimiter: The configured rate limiter.
+    """
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    backend: BucketBackend = (
+        RedisBucketBackend(redis_url) if redis_url else InMemoryBucketBackend()
+    )
+    return RateLimiter(
+        backend=backend,
+        hit=_spec_from_env("RATE_LIMIT_HIT", capacity=60, per_minute=120),
+        miss=_spec_from_env("RATE_LIMIT_MISS", capacity=5, per_minute=10),
+        global_miss=_spec_from_env("RATE_LIMIT_GLOBAL_MISS", capacity=50, per_minute=300),
+    )
+
+
+limiter = create_rate_limiter()
+
+TRUSTED_PROXY_HOPS = int(os.getenv("RATE_LIMIT_TRUSTED_PROXY_HOPS", "0"))
+
+
+def client_ip(request: Request) -> str:
+    """
+    Returns the address of the client that sent a request. Behind TRUSTED_PROXY_HOPS reverse proxies (e.g. 1 on Cloud Run) the peer address is the proxy's, so the address appended to X-Forwarded-For by the outermost trusted proxy is used instead; entries further left are client-supplied and ignored.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        str: The client IP address.
+    """
+    if TRUSTED_PROXY_HOPS:
+        hops = [
+            hop.strip()
+            for hop in request.headers.get("x-forwarded-for", "").split(",")
+            if hop.strip()
+        ]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+def client_identities(request: Request) -> List[str]:
+    """
+    Returns the keys a request is limited by: its client IP, plus the user ID when a valid bearer token is presented.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        List[str]: Bucket key suffixes such as ["ip:203.0.113.7", "user:42"].
+    """
+    clients = [f"ip:{client_ip(request)}"]
+    user_id = bearer_user_id(request)
+    if user_id is not None:
+        clients.append(f"user:{user_id}")
+    return clients
+
+
+async def rate_limited(request: Request) -> RateLimitScope:
+    """
+    FastAPI dependency for LLM-backed endpoints. Charges the request against the hit budget and returns the scope services use to charge the upstream budget.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        RateLimitScope: The rate limit identities of the request.
+
+    Raises:
+        RateLimitExceeded: If the client has exhausted its hit budget.
+    """
+    scope = RateLimitScope(limiter, client_identities(request))
+    await scope.acquire_hit()
+    return scope
@@ -0,0 +1,44 @@
+import logging
+from typing import Iterable, Optional
+
+import prisma
+import prisma.models
+
+logger = logging.getLogger(__name__)
+
+
+async def recordEmojiRequests(user_id: Optional[int], characters: Iterable[str]) -> int:
+    """
+    Records that a user asked for the explanation of the given emojis, as Request rows that rollupRequestStats folds into the request statistics. Request rows need a user, so anonymous calls are not recorded. Recording is best effort: a failure, e.g. while the database is unavailable and explanations are served from the snapshot, is logged and never fails the request.
+
+    Args:
+        user_id (Optional[int]): The authenticated caller, or None for anonymous calls.
+        characters (Iterable[str]): The emoji characters requested.
+
+    Returns:
+        int: The number of Request rows created.
+
+    Example:
+        await recordEmojiRequests(42, ['🍀', '👋'])
+        > 2
+    """
+    characters = list(characters)
+    if user_id is None or not characters:
+        return 0
+    try:
+        emoji_ids = {
+            record.character: record.id
+            for record in await prisma.models.Emoji.prisma().find_many(
+                where={"character": {"in": list(set(characters))}}
+            )
+        }
+        return await prisma.models.Request.prisma().create_many(
+            data=[
+                {"userId": user_id, "emojiId": emoji_ids[character]}
+                for character in characters
+                if character in emoji_ids
+            ]
+        )
+    except Exception:
+        logger.warning("Could not record emoji requests", exc_info=True)
+        return 0
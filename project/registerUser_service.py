@@ -1,9 +1,12 @@
 from datetime import datetime, timedelta
+from typing import List
 
 import bcrypt
 import jwt
 import prisma
+import prisma.enums
 import prisma.models
+from project.errors import AlreadyExistsError
 from pydantic import BaseModel
 
 
@@ -33,6 +36,9 @@ async def registerUser(email: str, password: str) -> UserRegistrationResponse:
     Returns:
         UserRegistrationResponse: Response provided after successful user registration, including the newly created user object and an authentication token.
 
+    Raises:
+        AlreadyExistsError: If a user is already registered with the email.
+
     Example:
         response = registerUser('john.doe@example.com', 's3cureP@ssword')
         response.authToken  # DO NOT PRINT OR LOG AUTH TOKENS IN PRODUCTION
@@ -41,14 +47,12 @@ async def registerUser(email: str, password: str) -> UserRegistrationResponse:
         where={"email": email}
     )
     if existing_user:
-        raise Exception("prisma.models.User already exists with this email")
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
+        raise AlreadyExistsError("prisma.models.User already exists with this email")
     new_user = await prisma.models.User.prisma().create(
         data={
             "email": email,
-            "role": "prisma.models.User",
-            "hashed_password": hashed_password.decode("utf-8"),
+            "role": prisma.enums.Role.User,
+            "hashed_password": hash_password(password),
         }
     )
     expiration_time = datetime.utcnow() + timedelta(hours=1)
@@ -60,3 +64,29 @@ async def registerUser(email: str, password: str) -> UserRegistrationResponse:
     )
     response = UserRegistrationResponse(user=user_response, authToken=token)
     return response
+
+
+def hash_password(password: str) -> str:
+    """
+    Hashes a password with a fresh bcrypt salt.
+
+    Args:
+        password (str): The plain text password.
+
+    Returns:
+        str: The bcrypt hash, as stored in User.hashed_password.
+    """
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hashes a batch of passwords. Used as the unit of work when hashing is spread over a process pool, so each task amortises the inter-process overhead over many bcrypt rounds.
+
+    Args:
+        passwords (List[str]): The plain text passwords.
+
+    Returns:
+        List[str]: The bcrypt hashes, in the same order.
+    """
+    return [hash_password(password) for password in passwords]
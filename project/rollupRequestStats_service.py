@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+import prisma
+import prisma.enums
+import prisma.models
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "emoji_request_stats"
+LAG_SECONDS = float(os.getenv("ROLLUP_LAG_SECONDS", "300"))
+
+_MERGE_COUNTS_SQL = """
+INSERT INTO "EmojiRequestStat" ("emojiId", "period", "bucketStart", "count")
+SELECT "emojiId", "period"::"StatPeriod", "bucketStart"::timestamp(3), "count"
+FROM unnest($1::int[], $2::text[], $3::text[], $4::int[])
+    AS batch("emojiId", "period", "bucketStart", "count")
+ON CONFLICT ("emojiId", "period", "bucketStart")
+DO UPDATE SET "count" = "EmojiRequestStat"."count" + EXCLUDED."count"
+"""
+
+
+class RollupResult(BaseModel):
+    """
+    Summary of a single rollup run: how many new Request rows were folded into the per-emoji statistics and the watermark the run advanced to.
+    """
+
+    processed_requests: int
+    updated_buckets: int
+    watermark: int
+
+
+def bucket_start(requested_at: datetime, period: prisma.enums.StatPeriod) -> datetime:
+    """
+    Truncates a request timestamp to the start of its hour or day bucket.
+
+    Args:
+        requested_at (datetime): The time the request was made.
+        period (prisma.enums.StatPeriod): The bucket granularity.
+
+    Returns:
+        datetime: The start of the bucket containing requested_at.
+    """
+    if period == prisma.enums.StatPeriod.Day:
+        return requested_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return requested_at.replace(minute=0, second=0, microsecond=0)
+
+
+async def rollupRequestStats(
+    batch_size: int = 5000, lag_seconds: float = LAG_SECONDS
+) -> RollupResult:
+    """
+    Folds Request rows created since the last watermark into the hourly and daily EmojiRequestStat counters. Each batch is aggregated in memory and applied together with the watermark in one transaction, so a crash never double counts and concurrent runs cannot process the same rows twice. The counts of a batch are merged with a single INSERT ... ON CONFLICT statement, so the transaction takes two round trips however many buckets the batch touches.
+
+    The watermark is a Request id, and ids are handed out before their transactions commit, so a recent row can become visible after a higher id was already rolled up. Only rows older than lag_seconds are read, which leaves every transaction that long to commit before the watermark can pass its row.
+
+    Args:
+        batch_size (int): Maximum number of Request rows read per batch.
+        lag_seconds (float): Minimum age of the Request rows that are rolled up.
+
+    Returns:
+        RollupResult: Summary of the rows processed and the new watermark.
+
+    Example:
+        result = await rollupRequestStats()
+        > RollupResult(processed_requests=1200, updated_buckets=85, watermark=48211)
+    """
+    watermark = await prisma.models.RollupWatermark.prisma().upsert(
+        where={"name": WATERMARK_NAME},
+        data={"create": {"name": WATERMARK_NAME}, "update": {}},
+    )
+    last_id = watermark.lastRequestId
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+    processed = 0
+    updated = 0
+    while True:
+        requests = await prisma.models.Request.prisma().find_many(
+            where={"id": {"gt": last_id}, "requestedAt": {"lt": cutoff}},
+            order={"id": "asc"},
+            take=batch_size,
+        )
+        if not requests:
+            break
+        counts: Counter[Tuple[int, prisma.enums.StatPeriod, datetime]] = Counter()
+        for request in requests:
+            if request.emojiId is None:
+                continue
+            for period in prisma.enums.StatPeriod:
+                counts[
+                    (request.emojiId, period, bucket_start(request.requestedAt, period))
+                ] += 1
+        new_last_id = requests[-1].id
+        async with prisma.get_client().tx() as tx:
+            advanced = await prisma.models.RollupWatermark.prisma(tx).update_many(
+                where={"name": WATERMARK_NAME, "lastRequestId": last_id},
+                data={"lastRequestId": new_last_id},
+            )
+            if not advanced:
+                raise RuntimeError("Rollup watermark was advanced by a concurrent run.")
+            if counts:
+                keys = list(counts)
+                await tx.execute_raw(
+                    _MERGE_COUNTS_SQL,
+                    [emoji_id for emoji_id, _, _ in keys],
+                    [period.value for _, period, _ in keys],
+                    [
+                        start.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+                        for _, _, start in keys
+                    ],
+                    [counts[key] for key in keys],
+                )
+        last_id = new_last_id
+        processed += len(requests)
+        updated += len(counts)
+        if len(requests) < batch_size:
+            break
+    return RollupResult(
+        processed_requests=processed, updated_buckets=updated, watermark=last_id
+    )
+
+
+async def run_periodic_rollup(interval_seconds: float) -> None:
+    """
+    Runs rollupRequestStats forever, sleeping interval_seconds between runs. Intended to be started as a background task by the server lifespan.
+
+    Args:
+        interval_seconds (float): Delay between two rollup runs.
+    """
+    while True:
+        try:
+            await rollupRequestStats()
+        except Exception:
+            logger.exception("Request stats rollup failed")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+
+    async def main() -> None:
+        client = prisma.Prisma(auto_register=True)
+        await client.connect()
+        try:
+            print(await rollupRequestStats())
+        finally:
+            await client.disconnect()
+
+    asyncio.run(main())
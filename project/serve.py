@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from socket import socket
+from types import FrameType
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import prisma
+import uvicorn
+from project.buildExplanationSnapshot_service import buildExplanationSnapshot
+from project.rollupRequestStats_service import rollupRequestStats
+
+multiprocessing.allow_connection_pickling()
+spawn = multiprocessing.get_context("spawn")
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def run_worker(config: uvicorn.Config, sockets: List[socket]) -> None:
+    """
+    Entry point of a worker process: serves the app on the sockets inherited from the supervisor.
+    """
+    config.configure_logging()
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+class WorkerSupervisor:
+    """
+    Runs several uvicorn workers on one shared listening socket, for using more than one core.
+
+    Before the workers start, and again on every reload, the supervisor rebuilds the explanation snapshot from the database. Every worker maps that file read-only, so the catalogue is held once in the page cache and shared by all workers, and a fresh worker can answer at once.
+
+    The supervisor also runs the request stats rollup every rollup_interval seconds, so there is one rollup loop however many workers run; the workers are started with their own rollup loop disabled.
+
+    Signals:
+        SIGHUP: rebuild the snapshot, then replace the workers one at a time. Each old worker only stops once its replacement is running, and it finishes its in-flight requests first.
+        SIGINT/SIGTERM: stop all workers gracefully and exit.
+
+    A worker that exits is restarted. If it keeps exiting within stable_after seconds of its start, e.g. because of a configuration error, each restart waits twice as long as the previous one, up to max_restart_delay seconds.
+
+    Args:
+        config (uvicorn.Config): Configuration shared by all workers.
+        workers (int): Number of worker processes.
+        snapshot_path (Optional[str]): Snapshot to rebuild, or None to serve without one.
+        rollup_interval (float): Seconds between two request stats rollups, or 0 to not run them.
+        startup_grace (float): Seconds a new worker gets to start before the worker it replaces is stopped.
+        stable_after (float): Seconds a worker has to run before its exit no longer counts as a failed start.
+        max_restart_delay (float): Upper bound of the delay before a failing worker is restarted.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers: int,
+        snapshot_path: Optional[str],
+        rollup_interval: float = 60.0,
+        startup_grace: float = 3.0,
+        stable_after: float = 30.0,
+        max_restart_delay: float = 60.0,
+    ):
+        self.config = config
+        self.workers = workers
+        self.snapshot_path = snapshot_path
+        self.rollup_interval = rollup_interval
+        self.startup_grace = startup_grace
+        self.stable_after = stable_after
+        self.max_restart_delay = max_restart_delay
+        self.sockets: List[socket] = []
+        self.processes: List[SpawnProcess] = []
+        self.started_at: Dict[int, float] = {}
+        self.failed_starts = [0] * workers
+        self.restart_at: List[Optional[float]] = [None] * workers
+        self.db_client = prisma.Prisma(auto_register=True)
+        self.should_exit = threading.Event()
+        self.should_reload = threading.Event()
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.should_exit.set()
+
+    def handle_reload(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.should_reload.set()
+
+    def with_database(self, task: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs a database task to completion on the supervisor's own connection, which is only open while the task runs.
+        """
+
+        async def run() -> Any:
+            await self.db_client.connect()
+            try:
+                return await task()
+            finally:
+                await self.db_client.disconnect()
+
+        return asyncio.run(run())
+
+    def refresh_snapshot(self) -> None:
+        """
+        Rebuilds the snapshot from the database. On failure the previous snapshot, if any, is kept, so workers can still start while the database is unavailable.
+        """
+        if not self.snapshot_path:
+            return
+        try:
+            result = self.with_database(
+                lambda: buildExplanationSnapshot(self.snapshot_path)
+            )
+            logger.info("Wrote %d explanations to %s", result.entries, result.path)
+        except Exception:
+            logger.warning(
+                "Could not rebuild %s, keeping the previous snapshot",
+                self.snapshot_path,
+                exc_info=True,
+            )
+
+    def rollup(self) -> None:
+        try:
+            result = self.with_database(rollupRequestStats)
+            logger.info(
+                "Rolled up %d requests into %d buckets",
+                result.processed_requests,
+                result.updated_buckets,
+            )
+        except Exception:
+            logger.warning("Request stats rollup failed", exc_info=True)
+
+    def spawn_worker(self) -> SpawnProcess:
+        process = spawn.Process(
+            target=run_worker,
+            kwargs={"config": self.config, "sockets": self.sockets},
+        )
+        process.start()
+        self.started_at[process.pid] = time.monotonic()
+        return process
+
+    def stop_worker(self, process: SpawnProcess) -> None:
+        process.terminate()
+        process.join((self.config.timeout_graceful_shutdown or 30) + 5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        self.started_at.pop(process.pid, None)
+
+    def reload(self) -> None:
+        self.refresh_snapshot()
+        for index, old in enumerate(list(self.processes)):
+            if self.should_exit.is_set():
+                return
+            self.processes[index] = self.spawn_worker()
+            self.restart_at[index] = None
+            time.sleep(self.startup_grace)
+            self.stop_worker(old)
+        logger.info("Reloaded %d workers", len(self.processes))
+
+    def restart_exited(self) -> None:
+        """
+        Restarts the workers that have exited, backing off exponentially while a worker keeps failing right after its start.
+        """
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process.is_alive() or self.should_exit.is_set():
+                continue
+            if self.restart_at[index] is None:
+                started_at = self.started_at.pop(process.pid, now)
+                if now - started_at < self.stable_after:
+                    self.failed_starts[index] += 1
+                else:
+                    self.failed_starts[index] = 0
+                delay = min(
+                    self.max_restart_delay, 2 ** self.failed_starts[index] - 1
+                )
+                self.restart_at[index] = now + delay
+                logger.warning(
+                    "Worker [%d] exited with %s, restarting in %.0fs",
+                    process.pid,
+                    process.exitcode,
+                    delay,
+                )
+            if now >= self.restart_at[index]:
+                self.restart_at[index] = None
+                self.processes[index] = self.spawn_worker()
+
+    def run(self) -> None:
+        self.refresh_snapshot()
+        self.sockets = [self.config.bind_socket()]
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        logger.info("Starting %d workers [%d]", self.workers, os.getpid())
+        self.processes = [self.spawn_worker() for _ in range(self.workers)]
+        next_rollup = time.monotonic()
+        while not self.should_exit.wait(0.5):
+            if self.should_reload.is_set():
+                self.should_reload.clear()
+                self.reload()
+            if self.rollup_interval > 0 and time.monotonic() >= next_rollup:
+                self.rollup()
+                next_rollup = time.monotonic() + self.rollup_interval
+            self.restart_exited()
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            self.stop_worker(process)
+        logger.info("Stopped workers [%d]", os.getpid())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the API with several worker processes sharing one explanation snapshot."
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes (default: $WEB_CONCURRENCY or 1)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        default=os.getenv("EXPLANATION_SNAPSHOT_PATH", "explanations.snapshot"),
+        help="Explanation snapshot shared by the workers",
+    )
+    parser.add_argument(
+        "--no-snapshot-refresh",
+        action="store_true",
+        help="Serve the existing snapshot without rebuilding it from the database",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="Seconds a stopping worker gets to finish in-flight requests",
+    )
+    args = parser.parse_args()
+    if args.workers > 1 and not os.getenv("RATE_LIMIT_REDIS_URL"):
+        parser.error(
+            "--workers > 1 requires RATE_LIMIT_REDIS_URL; in-memory rate limits "
+            "would give every worker its own full budget"
+        )
+    rollup_interval = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+    os.environ["EXPLANATION_SNAPSHOT_PATH"] = args.snapshot
+    os.environ["ROLLUP_INTERVAL_SECONDS"] = "0"
+    config = uvicorn.Config(
+        "project.server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    config.configure_logging()
+    WorkerSupervisor(
+        config,
+        workers=args.workers,
+        snapshot_path=None if args.no_snapshot_refresh else args.snapshot,
+        rollup_interval=rollup_interval,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
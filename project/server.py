@@ -1,31 +1,118 @@
+import asyncio
 import logging
+import os
 from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Callable, Coroutine, Optional
 
+import prisma.enums
+import project.annotateEmojiText_service
+import project.auth
+import project.bulkImportUsers_service
 import project.createEmojiExplanation_service
 import project.deleteUser_service
+import project.errors
 import project.explainEmoji_service
+import project.explanation_store
+import project.exportUsers_service
 import project.fetchEmojiExplanation_service
+import project.getTopEmojis_service
 import project.getUserProfile_service
 import project.listUsers_service
 import project.loginUser_service
 import project.processEmojiInput_service
+import project.rate_limiter
 import project.registerUser_service
+import project.rollupRequestStats_service
+import project.structured_logging
 import project.updateUser_service
-from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import Response
+from fastapi import Depends, FastAPI, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
 from prisma import Prisma
+from starlette.exceptions import HTTPException
 
 logger = logging.getLogger(__name__)
 
 db_client = Prisma(auto_register=True)
 
 
+async def reconnect_database(retry_seconds: float = 5.0) -> None:
+    """
+    Keeps trying to connect to the database until it succeeds, so a worker that started during a database outage recovers without a restart.
+    """
+    while not db_client.is_connected():
+        await asyncio.sleep(retry_seconds)
+        try:
+            await db_client.connect()
+            logger.info("Connected to the database")
+        except Exception as e:
+            logger.warning("Database still unavailable: %s", e)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await db_client.connect()
+    log_listener = project.structured_logging.start_queue_logging()
+    snapshot_path = os.getenv("EXPLANATION_SNAPSHOT_PATH", "explanations.snapshot")
+    if os.path.exists(snapshot_path):
+        try:
+            project.explanation_store.explanation_store.open_snapshot(snapshot_path)
+        except (project.explanation_store.SnapshotFormatError, OSError, ValueError) as e:
+            logger.warning(
+                "Could not open the explanation snapshot, serving without it: %s", e
+            )
+    reconnect_task = None
+    try:
+        await db_client.connect()
+    except Exception as e:
+        logger.warning(
+            "Database unavailable, serving from the explanation snapshot only: %s", e
+        )
+        reconnect_task = asyncio.create_task(reconnect_database())
+    rollup_interval = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+    rollup_task = None
+    if rollup_interval > 0:
+        rollup_task = asyncio.create_task(
+            project.rollupRequestStats_service.run_periodic_rollup(rollup_interval)
+        )
     yield
-    await db_client.disconnect()
+    if rollup_task:
+        rollup_task.cancel()
+    if reconnect_task:
+        reconnect_task.cancel()
+    await asyncio.to_thread(project.bulkImportUsers_service.shutdown_hash_pool)
+    if db_client.is_connected():
+        await db_client.disconnect()
+    log_listener.stop()
+
+
+class ServiceErrorRoute(APIRoute):
+    """
+    Route that turns unexpected service failures into 500 responses. Domain errors are left to the exception handler, which answers them without logging; only real faults are logged with their traceback, through the background logging queue.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            try:
+                return await route_handler(request)
+            except (
+                project.errors.DomainError,
+                HTTPException,
+                RequestValidationError,
+            ):
+                raise
+            except Exception as e:
+                logger.error(
+                    "Error processing request",
+                    exc_info=e,
+                    extra={"method": request.method, "path": request.url.path},
+                )
+                return JSONResponse(content={"error": str(e)}, status_code=500)
+
+        return handler
 
 
 app = FastAPI(
@@ -33,6 +120,21 @@ app = FastAPI(
     lifespan=lifespan,
     description="create a single endpoint that takes in an emoji and responds with the explaination. Use Groq and specifically llama3 to get the explaination from",
 )
+app.router.route_class = ServiceErrorRoute
+
+
+@app.exception_handler(project.errors.DomainError)
+async def domain_error_handler(
+    request: Request, exc: project.errors.DomainError
+) -> JSONResponse:
+    """
+    Answers expected service failures, such as unknown users, duplicate registrations or exhausted rate limits, with their 4xx status code.
+    """
+    return JSONResponse(
+        content={"error": str(exc)},
+        status_code=exc.status_code,
+        headers=exc.headers,
+    )
 
 
 @app.delete("/user", response_model=project.deleteUser_service.DeleteUserResponse)
@@ -42,18 +144,8 @@ async def api_delete_deleteUser(
     """
     Allows a user to delete their account using their user ID. Requires authentication and is restricted to ensure only the account owner can delete their profile.
     """
-    try:
-        res = await project.deleteUser_service.deleteUser(user_id)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.deleteUser_service.deleteUser(user_id)
+    return res
 
 
 @app.post(
@@ -66,20 +158,10 @@ async def api_post_createEmojiExplanation(
     """
     Processes an emoji sent by the user and returns its explanation by leveraging the GROQ query language over the llama3 dataset. Requires authentication to ensure only registered users can access.
     """
-    try:
-        res = await project.createEmojiExplanation_service.createEmojiExplanation(
-            emoji_character
-        )
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.createEmojiExplanation_service.createEmojiExplanation(
+        emoji_character
+    )
+    return res
 
 
 @app.put("/user", response_model=project.updateUser_service.UpdateUserProfileResponse)
@@ -89,18 +171,8 @@ async def api_put_updateUser(
     """
     Enables users to update their profile details such as email, password, and username. Requires an access token to ensure authentication and that non-admin users can only edit their own account.
     """
-    try:
-        res = await project.updateUser_service.updateUser(email, password, username)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.updateUser_service.updateUser(email, password, username)
+    return res
 
 
 @app.post(
@@ -108,22 +180,16 @@ async def api_put_updateUser(
 )
 async def api_post_explainEmoji(
     emoji: str,
+    rate_limit: project.rate_limiter.RateLimitScope = Depends(
+        project.rate_limiter.rate_limited
+    ),
+    user_id: Optional[int] = Depends(project.auth.bearer_user_id),
 ) -> project.explainEmoji_service.EmojiExplanationResponse | Response:
     """
     This endpoint accepts a POST request containing a JSON body with an emoji character. It processes the input to extract the emoji and sends it to the Emoji Input Processor module. Upon receiving the processed emoji, it queries the Explanation Generator which uses the Groq and llama3 to fetch an accurate explanation of the emoji. The response will be a JSON object containing the original emoji and its explanation. It ensures that data encoding and transfer are handled efficiently to maintain the request-response cycle's speed.
     """
-    try:
-        res = await project.explainEmoji_service.explainEmoji(emoji)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.explainEmoji_service.explainEmoji(emoji, rate_limit, user_id)
+    return res
 
 
 @app.post(
@@ -132,22 +198,18 @@ async def api_post_explainEmoji(
 )
 async def api_post_processEmojiInput(
     emoji_character: str,
+    rate_limit: project.rate_limiter.RateLimitScope = Depends(
+        project.rate_limiter.rate_limited
+    ),
+    user_id: Optional[int] = Depends(project.auth.bearer_user_id),
 ) -> project.processEmojiInput_service.EmojiProcessResponse | Response:
     """
     This endpoint accepts an emoji character as input through POST request. It validates the input to ensure it's a proper emoji character. Upon successful validation, it forwards the emoji to the Explanation Generator module which uses llama3 with Groq to fetch the explanation. The client then receives a response with the description of the emoji. If the input is not valid, a 400 error code is generated with a message explaining the error.
     """
-    try:
-        res = await project.processEmojiInput_service.processEmojiInput(emoji_character)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.processEmojiInput_service.processEmojiInput(
+        emoji_character, rate_limit, user_id
+    )
+    return res
 
 
 @app.get("/users", response_model=project.listUsers_service.AdminUserListResponse)
@@ -157,18 +219,8 @@ async def api_get_listUsers(
     """
     Provides a list of all registered users. Restricted to administrators only. Useful for user management and monitoring purposes.
     """
-    try:
-        res = await project.listUsers_service.listUsers(request)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.listUsers_service.listUsers(request)
+    return res
 
 
 @app.get("/user", response_model=project.getUserProfile_service.UserProfileResponse)
@@ -178,18 +230,8 @@ async def api_get_getUserProfile(
     """
     Returns the profile information of thee authenticated user. Requires an access token to verify the user's identity. This ensures that users can only access their own information.
     """
-    try:
-        res = await project.getUserProfile_service.getUserProfile(access_token)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.getUserProfile_service.getUserProfile(access_token)
+    return res
 
 
 @app.post(
@@ -201,18 +243,8 @@ async def api_post_registerUser(
     """
     This endpoint allows a new user to register. It accepts username, email, and password, and upon successful registration, it returns a user object and an authentication token. The endpoint does not require authentication.
     """
-    try:
-        res = await project.registerUser_service.registerUser(username, email, password)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.registerUser_service.registerUser(email, password)
+    return res
 
 
 @app.post("/login", response_model=project.loginUser_service.LoginResponse)
@@ -222,18 +254,8 @@ async def api_post_loginUser(
     """
     Allows a user to log in by providing an email and password. If credentials are valid, it returns an access token, which is required for making authenticated requests to protected routes.
     """
-    try:
-        res = await project.loginUser_service.loginUser(email, password)
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+    res = await project.loginUser_service.loginUser(email, password)
+    return res
 
 
 @app.post(
@@ -242,21 +264,105 @@ async def api_post_loginUser(
 )
 async def api_post_fetchEmojiExplanation(
     emoji_character: str,
+    rate_limit: project.rate_limiter.RateLimitScope = Depends(
+        project.rate_limiter.rate_limited
+    ),
+    user_id: Optional[int] = Depends(project.auth.bearer_user_id),
 ) -> project.fetchEmojiExplanation_service.EmojiExplanationResponse | Response:
     """
     This endpoint accepts a POST request containing an emoji character in the request body. It utilizes Groq to query the llama3 model to generate an explanation of the emoji. The response includes the original emoji and its explanation. Intermediate processing stages include handling the request data in the Emoji Input Processor, querying the llama3 model, and finally, the Explanation Generator formulates the proper response format before sending it back to the API Gateway.
     """
-    try:
-        res = await project.fetchEmojiExplanation_service.fetchEmojiExplanation(
-            emoji_character
-        )
-        return res
-    except Exception as e:
-        logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
+    res = await project.fetchEmojiExplanation_service.fetchEmojiExplanation(
+        emoji_character, rate_limit, user_id
+    )
+    return res
+
+
+@app.get(
+    "/admin/stats/top-emojis",
+    response_model=project.getTopEmojis_service.TopEmojisResponse,
+    dependencies=[Depends(project.auth.require_admin)],
+)
+async def api_get_getTopEmojis(
+    period: prisma.enums.StatPeriod = prisma.enums.StatPeriod.Day,
+    limit: int = Query(10, ge=1, le=100),
+    bucket_start: Optional[datetime] = None,
+) -> project.getTopEmojis_service.TopEmojisResponse | Response:
+    """
+    Returns the most requested emojis of an hourly or daily bucket, served from the precomputed request rollups. Restricted to administrators only.
+    """
+    res = await project.getTopEmojis_service.getTopEmojis(
+        period, limit, bucket_start
+    )
+    return res
+
+
+@app.post(
+    "/admin/users/import",
+    response_model=project.bulkImportUsers_service.BulkImportResponse,
+    dependencies=[Depends(project.auth.require_admin)],
+)
+async def api_post_bulkImportUsers(
+    request: Request,
+    format: project.bulkImportUsers_service.UserFileFormat = "csv",
+) -> project.bulkImportUsers_service.BulkImportResponse | Response:
+    """
+    Registers users in bulk from a CSV or NDJSON request body, streamed and processed in chunks. Restricted to administrators only.
+    """
+    res = await project.bulkImportUsers_service.bulkImportUsers(
+        project.bulkImportUsers_service.iter_lines(request.stream()), format
+    )
+    return res
+
+
+@app.get("/admin/users/export", dependencies=[Depends(project.auth.require_admin)])
+async def api_get_exportUsers(
+    format: project.bulkImportUsers_service.UserFileFormat = "csv",
+) -> StreamingResponse:
+    """
+    Streams all registered users as CSV or NDJSON. Restricted to administrators only.
+    """
+    return StreamingResponse(
+        project.exportUsers_service.exportUsers(format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+    )
+
+
+@app.post(
+    "/api/emoji/annotate",
+    response_model=project.annotateEmojiText_service.AnnotateEmojiResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": project.annotateEmojiText_service.AnnotateEmojiRequest.model_json_schema()
+                }
+            },
+        }
+    },
+)
+async def api_post_annotateEmojiText(
+    request: project.annotateEmojiText_service.AnnotateEmojiRequest = Depends(
+        project.annotateEmojiText_service.read_annotate_request
+    ),
+    stream: bool = False,
+    rate_limit: project.rate_limiter.RateLimitScope = Depends(
+        project.rate_limiter.rate_limited
+    ),
+    user_id: Optional[int] = Depends(project.auth.bearer_user_id),
+) -> project.annotateEmojiText_service.AnnotateEmojiResponse | Response:
+    """
+    This endpoint accepts a free-text message, such as a chat message, and explains every emoji it contains. Each emoji is returned with its character offsets in the message; repeated emojis are resolved once. With stream=true the spans are streamed back as NDJSON, which allows much longer messages.
+    """
+    if stream:
+        return StreamingResponse(
+            project.annotateEmojiText_service.streamEmojiAnnotations(
+                request.text, rate_limit, user_id
+            ),
+            media_type="application/x-ndjson",
         )
+    res = await project.annotateEmojiText_service.annotateEmojiText(
+        request.text, rate_limit, user_id
+    )
+    return res
@@ -0,0 +1,67 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line. Fields passed through `extra`, such as method and path, are included as top-level keys.
+    """
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in self._RESERVED
+        )
+        if record.exc_info:
+            entry["exc_type"] = record.exc_info[0].__name__ if record.exc_info[0] else None
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread. The stock QueueHandler formats the record, including its traceback, in the calling thread; here only the message is resolved, so request handlers pay for an enqueue and nothing else.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def start_queue_logging(
+    logger_name: str = "project", level: int = logging.INFO
+) -> logging.handlers.QueueListener:
+    """
+    Routes the application loggers through a queue to a background thread that writes JSON lines to stderr, so log I/O and traceback formatting never block the event loop.
+
+    Args:
+        logger_name (str): Root of the logger hierarchy to route through the queue.
+        level (int): Minimum level that is logged.
+
+    Returns:
+        logging.handlers.QueueListener: The started listener; stop it on shutdown to flush pending records.
+    """
+    log_queue: "queue.SimpleQueue[Optional[logging.LogRecord]]" = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+    logger = logging.getLogger(logger_name)
+    logger.handlers = [DeferredQueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener